@@ -112,28 +112,22 @@ async def submit_query(request: QueryRequest) -> QueryResponse:
         # Log generation
         decision_logger.log_generation(request.query, generation_result)
         
-        # Save to metadata store
-        metadata_store.save_query(
-            query_id=query_id,
-            query_text=request.query,
-            budget=request.budget,
-            model=generation_result.get('model'),
-            temperature=request.temperature
-        )
-        
-        # Save chunks
+        # Save query, chunks, and response in a single transaction
         all_chunks = selected_chunks + optimization_result.get('excluded_chunks', [])
-        metadata_store.save_query_chunks(query_id, all_chunks, optimization_result)
-        
-        # Save response
         response_id = str(uuid.uuid4())
-        metadata_store.save_response(
-            response_id=response_id,
+        metadata_store.save_query_bundle(
             query_id=query_id,
+            query_text=request.query,
+            chunks=all_chunks,
+            response_id=response_id,
             answer_text=generation_result.get('answer', ''),
             usage=generation_result.get('usage', {}),
             chunks_included_count=len(selected_chunks),
-            budget_used=optimization_result.get('budget_used', 0)
+            budget=request.budget,
+            model=generation_result.get('model'),
+            temperature=request.temperature,
+            budget_used=optimization_result.get('budget_used', 0),
+            optimization_result=optimization_result
         )
         
         # Prepare response
@@ -2,11 +2,20 @@
 
 import logging
 import re
+from bisect import bisect_left
 from typing import List, Dict, Any, Optional
 from contextllm.utils.config import get_config
 
 logger = logging.getLogger(__name__)
 
+# Pattern to match sentence endings (period, exclamation, question mark)
+# followed by whitespace and capital letter or end of string. Compiled
+# once at import so repeated chunking skips the regex-cache lookup.
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z])|(?<=[.!?])\s*$')
+
+# Word-boundary characters the character chunker may break at
+_BREAK_RE = re.compile(r'[ \n]')
+
 
 class TextChunker:
     """Chunks text into smaller pieces with optional sentence-aware splitting."""
@@ -53,11 +62,8 @@ class TextChunker:
         Returns:
             List of sentences
         """
-        # Pattern to match sentence endings (period, exclamation, question mark)
-        # Followed by whitespace and capital letter or end of string
-        sentence_pattern = r'(?<=[.!?])\s+(?=[A-Z])|(?<=[.!?])\s*$'
-        sentences = re.split(sentence_pattern, text)
-        
+        sentences = _SENTENCE_RE.split(text)
+
         # Filter out empty sentences
         sentences = [s.strip() for s in sentences if s.strip()]
         return sentences
@@ -147,34 +153,51 @@ class TextChunker:
         if not text.strip():
             return []
         
-        chunks = []
         start = 0
         text_length = len(text)
-        
+
+        # Collect all word-boundary positions in one C-level regex pass;
+        # each window then finds its break point with a bisect instead of
+        # two rfind scans over the window text
+        breaks = [m.start() for m in _BREAK_RE.finditer(text)]
+        search_start = max(0, int(self.chunk_size * 0.9))
+
+        # Preallocate the output from the smallest possible stride (a
+        # break just past the search threshold) so index assignment avoids
+        # amortized list-growth copies. Overlaps reaching into the break
+        # search window can stride slower than that bound, so the fill
+        # loop falls back to append if the estimate is ever exhausted.
+        min_stride = max(1, min(self.chunk_size, search_start + 1) - self.chunk_overlap)
+        chunks: List[str] = [''] * (text_length // min_stride + 1)
+        capacity = len(chunks)
+        count = 0
+
         while start < text_length:
             end = start + self.chunk_size
-            chunk = text[start:end]
-            
+
             # Try to break at word boundary if not at end
             if end < text_length:
-                # Look for last space or newline in the last 10% of chunk
-                search_start = max(0, int(self.chunk_size * 0.9))
-                last_space = chunk.rfind(' ', search_start)
-                last_newline = chunk.rfind('\n', search_start)
-                break_point = max(last_space, last_newline)
-                
-                if break_point > search_start:
-                    chunk = chunk[:break_point]
-                    end = start + break_point
-            
-            chunks.append(chunk.strip())
-            
+                # Last break before the window end, accepted only if it
+                # falls in the final 10% of the window
+                idx = bisect_left(breaks, end) - 1
+                if idx >= 0:
+                    break_point = breaks[idx] - start
+                    if break_point > search_start:
+                        end = start + break_point
+
+            chunk_text = text[start:end].strip()
+            if count < capacity:
+                chunks[count] = chunk_text
+            else:
+                chunks.append(chunk_text)
+            count += 1
+
             # Move start position with overlap
             if end >= text_length:
                 break
             start = end - self.chunk_overlap
-        
-        return [chunk for chunk in chunks if chunk]  # Remove empty chunks
+
+        return [chunk for chunk in chunks[:count] if chunk]  # Remove empty chunks
     
     def chunk(self, text: str) -> List[str]:
         """
@@ -214,21 +237,27 @@ class TextChunker:
         doc_metadata = document.get('metadata', {})
         
         chunks = self.chunk(text)
-        chunk_list = []
-        
-        for idx, chunk_text in enumerate(chunks):
-            chunk_metadata = {
-                'chunk_index': idx,
-                'total_chunks': len(chunks),
-                'source': doc_metadata.get('source', ''),
-                'filename': doc_metadata.get('filename', ''),
-                'file_type': doc_metadata.get('file_type', ''),
-            }
-            
-            chunk_list.append({
+
+        # One shared metadata template; each chunk takes a shallow copy
+        # with only its index filled in, so the document fields are looked
+        # up once instead of per chunk. The copies stay independent dicts
+        # (not a read-only MappingProxyType) because downstream stages
+        # mutate chunk metadata in place.
+        meta_template = {
+            'chunk_index': 0,
+            'total_chunks': len(chunks),
+            'source': doc_metadata.get('source', ''),
+            'filename': doc_metadata.get('filename', ''),
+            'file_type': doc_metadata.get('file_type', ''),
+        }
+
+        chunk_list = [
+            {
                 'text': chunk_text,
-                'metadata': chunk_metadata
-            })
-        
+                'metadata': {**meta_template, 'chunk_index': idx}
+            }
+            for idx, chunk_text in enumerate(chunks)
+        ]
+
         logger.info(f"Chunked document '{doc_metadata.get('filename', 'unknown')}' into {len(chunks)} chunks")
         return chunk_list
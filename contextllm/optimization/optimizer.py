@@ -1,18 +1,158 @@
 """Core optimization algorithm for selecting chunks within budget."""
 
+import functools
 import logging
+from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
+
+import numpy as np
+
 from contextllm.optimization.token_estimator import (
     add_token_counts_to_chunks,
     get_chunk_token_count
 )
 from contextllm.optimization.scorer import score_chunks, get_relevance_score
 from contextllm.optimization.budget import BudgetManager, validate_budget
+from contextllm.utils.config import get_config
 from contextllm.utils.errors import BudgetTooSmallError
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ChunkBatch:
+    """
+    Structure-of-arrays view over a list of chunk dicts.
+
+    The optimizer's numeric passes (value-per-token, argsort, greedy
+    kernel, MMR) operate on the score and token arrays directly instead
+    of doing dict lookups per chunk per iteration; the original dicts are
+    only touched when materializing results.
+    """
+
+    ids: List[str]
+    texts: List[str]
+    scores: np.ndarray
+    tokens: np.ndarray
+    metas: List[Dict[str, Any]]
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict[str, Any]]) -> "ChunkBatch":
+        """
+        Build a batch from chunk dicts, extracting each field once.
+
+        Args:
+            chunks: List of chunk dictionaries with scores and token counts
+
+        Returns:
+            ChunkBatch with parallel arrays aligned to the input order
+        """
+        n = len(chunks)
+        scores = np.fromiter(
+            (get_relevance_score(chunk) for chunk in chunks), dtype=np.float64, count=n
+        )
+        tokens = np.fromiter(
+            (get_chunk_token_count(chunk) for chunk in chunks), dtype=np.int64, count=n
+        )
+        return cls(
+            ids=[chunk.get('chunk_id', '') for chunk in chunks],
+            texts=[chunk.get('text', '') for chunk in chunks],
+            scores=scores,
+            tokens=tokens,
+            metas=[chunk.setdefault('metadata', {}) for chunk in chunks]
+        )
+
+
+def _greedy_select(order: np.ndarray, tokens: np.ndarray, budget: int):
+    """
+    Walk chunks in value order and mark those that fit the budget.
+
+    Pure numeric kernel: index arrays in, boolean mask and token total
+    out, so it can be JIT-compiled when numba is installed.
+
+    Args:
+        order: Chunk indices sorted by descending value per token
+        tokens: Token count per chunk, aligned to chunk index
+        budget: Available token budget
+
+    Returns:
+        Tuple of (included mask aligned to chunk index, total tokens used)
+    """
+    included = np.zeros(tokens.shape[0], dtype=np.bool_)
+    total = 0
+    for idx in order:
+        token_count = tokens[idx]
+        if total + token_count <= budget:
+            included[idx] = True
+            total += token_count
+    return included, total
+
+
+@functools.lru_cache(maxsize=32)
+def _specialized_mmr(redundancy_weight: float, budget: int):
+    """
+    Build an MMR selection routine specialized for one (weight, budget).
+
+    A service usually runs with a fixed redundancy weight and a handful
+    of budgets, so the closure for each pair is built once and cached.
+    The scalars and numpy entry points are bound as default arguments,
+    making every read inside the loop a LOAD_FAST instead of a global or
+    attribute lookup.
+
+    Args:
+        redundancy_weight: Penalty weight for similarity to selection
+        budget: Token budget for selection
+
+    Returns:
+        Callable (relevance, tokens_arr, token_counts, sim) -> pick list
+    """
+
+    def select(
+        relevance: np.ndarray,
+        tokens_arr: np.ndarray,
+        token_counts: List[int],
+        sim: np.ndarray,
+        _weight: float = redundancy_weight,
+        _budget: int = budget,
+        _where=np.where,
+        _argmax=np.argmax
+    ) -> List[int]:
+        n = len(token_counts)
+
+        # Incremental redundancy: adding sim[pick] after each selection
+        # keeps each iteration O(n) instead of re-summing over picks
+        redund = np.zeros(n)
+        remaining_mask = np.ones(n, dtype=bool)
+        picks: List[int] = []
+        picks_append = picks.append
+        remaining_budget = _budget
+
+        while True:
+            candidates = remaining_mask & (tokens_arr <= remaining_budget)
+            if not candidates.any():
+                break
+            gain = _where(candidates, relevance - _weight * redund, -np.inf)
+            pick = int(_argmax(gain))
+            picks_append(pick)
+            remaining_mask[pick] = False
+            remaining_budget -= token_counts[pick]
+            redund += sim[pick]
+
+        return picks
+
+    return select
+
+
+try:
+    from numba import njit
+    _greedy_select = njit(cache=True)(_greedy_select)
+    # Warm the JIT on an empty input at import so the first request does
+    # not pay compilation cost
+    _greedy_select(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 0)
+except ImportError:
+    pass
+
+
 class ContextOptimizer:
     """Optimizes context selection based on value per token."""
     
@@ -94,45 +234,110 @@ class ContextOptimizer:
         chunks = add_token_counts_to_chunks(chunks)
         chunks = score_chunks(chunks)
         
-        # Calculate value per token for each chunk
-        for chunk in chunks:
-            value = self.calculate_value_per_token(chunk)
-            if 'metadata' not in chunk:
-                chunk['metadata'] = {}
-            chunk['metadata']['value_per_token'] = value
+        # Extract fields into parallel arrays once; the numeric passes
+        # below never touch the chunk dicts again
+        batch = ChunkBatch.from_chunks(chunks)
+        n = len(chunks)
+        relevance = batch.scores
+        tokens_arr = batch.tokens
+        token_counts = tokens_arr.tolist()
+
+        # Calculate value per token vectorized: one numpy divide over all
+        # chunks instead of a Python division per chunk
+        values = np.divide(
+            relevance, tokens_arr, out=np.zeros(n), where=tokens_arr > 0
+        )
+
+        for chunk, meta, value, token_count in zip(chunks, batch.metas, values.tolist(), token_counts):
+            if token_count == 0:
+                logger.warning(f"Chunk {chunk.get('chunk_id', 'unknown')} has zero tokens")
+            meta['value_per_token'] = value
             chunk['value_per_token'] = value
-        
-        # Sort chunks by value per token (descending)
-        sorted_chunks = sorted(chunks, key=lambda x: x.get('value_per_token', 0), reverse=True)
-        
-        # Greedy selection: add chunks until budget is exhausted
+
+        # Sort by value per token (descending) in C; the stable kind keeps
+        # the same tie order as the previous sorted(reverse=True)
+        order_arr = np.argsort(-values, kind='stable')
+        order = order_arr.tolist()
+
+        # Optional redundancy-aware (MMR) selection: only when a
+        # redundancy weight is configured and every chunk carries an
+        # embedding; otherwise pure value-per-token greedy
+        redundancy_weight = get_config().get("optimization.redundancy_weight", 0.0)
+        algorithm = 'greedy_value_per_token'
+        picks = None
+        if redundancy_weight > 0:
+            embeddings = [chunk.get('embedding') for chunk in chunks]
+            if all(embedding is not None for embedding in embeddings):
+                picks = self._select_mmr(
+                    np.asarray(embeddings, dtype=np.float32),
+                    relevance,
+                    tokens_arr,
+                    token_counts,
+                    available_budget,
+                    redundancy_weight
+                )
+                algorithm = 'greedy_mmr'
+            else:
+                logger.warning(
+                    "optimization.redundancy_weight is set but chunks have no "
+                    "embeddings; using value-per-token selection"
+                )
+
+        # Greedy selection: add chunks until budget is exhausted. Bind the
+        # list appends once so the per-chunk loops skip the method lookup.
         selected_chunks = []
         excluded_chunks = []
+        selected_append = selected_chunks.append
+        excluded_append = excluded_chunks.append
         total_tokens = 0
-        
-        for chunk in sorted_chunks:
-            token_count = get_chunk_token_count(chunk)
-            
-            # Check if chunk fits in remaining budget
-            if total_tokens + token_count <= available_budget:
-                selected_chunks.append(chunk)
-                total_tokens += token_count
+
+        if picks is not None:
+            for i in picks:
+                chunk = chunks[i]
+                selected_append(chunk)
+                total_tokens += token_counts[i]
                 chunk['metadata']['included'] = True
                 chunk['metadata']['inclusion_reason'] = 'fits_in_budget'
-            else:
-                excluded_chunks.append(chunk)
+
+            picked = set(picks)
+            for i in order:
+                if i in picked:
+                    continue
+                chunk = chunks[i]
+                excluded_append(chunk)
                 chunk['metadata']['included'] = False
                 if total_tokens == 0:
                     chunk['metadata']['inclusion_reason'] = 'exceeds_budget'
                 else:
                     chunk['metadata']['inclusion_reason'] = 'budget_exhausted'
-        
+        else:
+            # Numeric feasibility pass runs in the (optionally jitted)
+            # kernel; this loop only materializes lists and metadata
+            included_mask, kernel_total = _greedy_select(
+                order_arr, tokens_arr, available_budget
+            )
+            total_tokens = int(kernel_total)
+
+            for i in order:
+                chunk = chunks[i]
+                if included_mask[i]:
+                    selected_append(chunk)
+                    chunk['metadata']['included'] = True
+                    chunk['metadata']['inclusion_reason'] = 'fits_in_budget'
+                else:
+                    excluded_append(chunk)
+                    chunk['metadata']['included'] = False
+                    if not selected_chunks:
+                        chunk['metadata']['inclusion_reason'] = 'exceeds_budget'
+                    else:
+                        chunk['metadata']['inclusion_reason'] = 'budget_exhausted'
+
         # Calculate budget usage
         budget_used = (total_tokens / available_budget * 100) if available_budget > 0 else 0
         
         # Prepare metadata
         selection_metadata = {
-            'algorithm': 'greedy_value_per_token',
+            'algorithm': algorithm,
             'chunks_evaluated': len(chunks),
             'chunks_selected': len(selected_chunks),
             'chunks_excluded': len(excluded_chunks),
@@ -155,6 +360,41 @@ class ContextOptimizer:
             'selection_metadata': selection_metadata
         }
     
+    def _select_mmr(
+        self,
+        embeddings: np.ndarray,
+        relevance: np.ndarray,
+        tokens_arr: np.ndarray,
+        token_counts: List[int],
+        available_budget: int,
+        redundancy_weight: float
+    ) -> List[int]:
+        """
+        Select chunk indices by maximal marginal relevance under budget.
+
+        Each pick maximizes relevance - redundancy_weight * redundancy,
+        where redundancy is the summed cosine similarity to already
+        selected chunks.
+
+        Args:
+            embeddings: (n, dim) float32 chunk embedding matrix
+            relevance: Relevance score per chunk
+            tokens_arr: Token count per chunk as an int array
+            token_counts: Token count per chunk as Python ints
+            available_budget: Token budget for selection
+            redundancy_weight: Penalty weight for similarity to selection
+
+        Returns:
+            List of selected chunk indices, in pick order
+        """
+        # Normalize rows once so dot products are cosine similarities
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.maximum(norms, 1e-12)
+        sim = embeddings @ embeddings.T
+
+        select = _specialized_mmr(redundancy_weight, available_budget)
+        return select(relevance, tokens_arr, token_counts, sim)
+
     def explain_selection(self, optimization_result: Dict[str, Any]) -> str:
         """
         Generate human-readable explanation of selection.
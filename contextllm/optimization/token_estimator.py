@@ -6,6 +6,16 @@ from contextllm.utils.tokenizer import count_tokens, count_tokens_batch
 
 logger = logging.getLogger(__name__)
 
+# Token counts keyed by chunk_id: the same chunk is scored against many
+# queries in a RAG pipeline, and its id is stable while its text is not
+# cheap to re-hash, so repeat optimizer calls skip tokenization entirely
+_CHUNK_TOKENS: Dict[str, int] = {}
+
+
+def clear_chunk_token_cache() -> None:
+    """Clear the per-chunk-id token count cache (intended for tests)."""
+    _CHUNK_TOKENS.clear()
+
 
 def estimate_chunk_tokens(chunk: Dict[str, Any]) -> int:
     """
@@ -42,16 +52,37 @@ def estimate_chunks_tokens(chunks: List[Dict[str, Any]]) -> List[int]:
     """
     if not chunks:
         return []
-    
-    texts = [chunk.get('text', '') for chunk in chunks]
-    
-    try:
-        token_counts = count_tokens_batch(texts)
-        return token_counts
-    except Exception as e:
-        logger.warning(f"Error in batch token estimation: {e}, using fallback")
-        # Fallback: individual estimation
-        return [estimate_chunk_tokens(chunk) for chunk in chunks]
+
+    # Resolve by chunk_id first; only cache misses go to the tokenizer
+    counts: List[Optional[int]] = [None] * len(chunks)
+    miss_chunks: List[Dict[str, Any]] = []
+    miss_indices: List[int] = []
+
+    for i, chunk in enumerate(chunks):
+        chunk_id = chunk.get('chunk_id')
+        cached = _CHUNK_TOKENS.get(chunk_id) if chunk_id else None
+        if cached is not None:
+            counts[i] = cached
+        else:
+            miss_chunks.append(chunk)
+            miss_indices.append(i)
+
+    if miss_chunks:
+        texts = [chunk.get('text', '') for chunk in miss_chunks]
+        try:
+            miss_counts = count_tokens_batch(texts)
+        except Exception as e:
+            logger.warning(f"Error in batch token estimation: {e}, using fallback")
+            # Fallback: individual estimation
+            miss_counts = [estimate_chunk_tokens(chunk) for chunk in miss_chunks]
+
+        for i, chunk, count in zip(miss_indices, miss_chunks, miss_counts):
+            counts[i] = count
+            chunk_id = chunk.get('chunk_id')
+            if chunk_id:
+                _CHUNK_TOKENS[chunk_id] = count
+
+    return counts
 
 
 def add_token_counts_to_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -5,6 +5,8 @@ from contextllm.utils.tokenizer import (
     get_tokenizer,
     count_tokens,
     count_tokens_batch,
+    count_tokens_batch_array,
+    count_tokens_fast,
     estimate_tokens_for_prompt
 )
 from contextllm.utils.logging_setup import setup_logging
@@ -21,6 +23,8 @@ __all__ = [
     "get_tokenizer",
     "count_tokens",
     "count_tokens_batch",
+    "count_tokens_batch_array",
+    "count_tokens_fast",
     "estimate_tokens_for_prompt",
     "setup_logging",
     "DecisionLogger",
@@ -1,183 +1,315 @@
 """Caching utilities for embeddings and token counts."""
 
+import functools
 import logging
 import hashlib
-import json
-import pickle
+import sqlite3
 from pathlib import Path
 from typing import Optional, Dict, Any
-from contextllm.utils.config import get_config
+
+import numpy as np
+
+from contextllm.utils.config import get_config, _ensure_dir
 
 logger = logging.getLogger(__name__)
 
+# One-shot OpenSSL hasher bound once; avoids re-resolving the attribute
+# and lets the C implementation run directly on the raw buffer.
+_sha256 = hashlib.sha256
+
+
+def _hash_text(text) -> bytes:
+    """
+    Hash text (or pre-encoded bytes) to a raw 32-byte digest.
+
+    Args:
+        text: Text string or UTF-8 bytes to hash
+
+    Returns:
+        Raw SHA-256 digest bytes
+    """
+    if isinstance(text, str):
+        text = text.encode('utf-8')
+    return _sha256(text).digest()
+
 
 class EmbeddingCache:
-    """Cache for embeddings to avoid recomputation."""
-    
+    """
+    Cache for embeddings stored as one contiguous float32 matrix.
+
+    Instead of one pickle file per text, all embeddings live in a single
+    (capacity, dim) np.memmap with a SQLite index mapping text hash to
+    row. Scans over the cached matrix stream contiguous memory, and each
+    entry costs one row write instead of a file create.
+    """
+
+    _INITIAL_CAPACITY = 1024
+
     def __init__(self, cache_dir: Optional[str] = None):
         """
         Initialize embedding cache.
-        
+
         Args:
             cache_dir: Directory for cache files (uses config if None)
         """
         config = get_config()
         if cache_dir is None:
             cache_dir = config.get("cache.embedding_dir", "./data/cache/embeddings")
-        
+
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
-        
-        logger.info(f"Embedding cache initialized at {self.cache_dir}")
-    
-    def _get_cache_key(self, text: str) -> str:
+        _ensure_dir(str(self.cache_dir))
+
+        self.matrix_path = self.cache_dir / "embeddings.f32"
+        self.db_path = self.cache_dir / "keys.db"
+
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS keys (
+                key BLOB PRIMARY KEY,
+                row INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        self._dim = self._get_meta('dim')
+        self._count = self._get_meta('count') or 0
+        self._mm: Optional[np.memmap] = None
+        self._capacity = 0
+
+        if self._dim and self.matrix_path.exists():
+            row_bytes = self._dim * 4  # float32
+            self._capacity = self.matrix_path.stat().st_size // row_bytes
+            self._mm = np.memmap(
+                self.matrix_path, dtype=np.float32, mode='r+',
+                shape=(self._capacity, self._dim)
+            )
+
+        logger.info(f"Embedding cache initialized at {self.cache_dir} ({self._count} entries)")
+
+    def _get_meta(self, name: str) -> Optional[int]:
+        """Read an integer value from the meta table."""
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name: str, value: int) -> None:
+        """Write an integer value to the meta table."""
+        self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    def _open_matrix(self, capacity: int) -> None:
+        """(Re)open the memmap matrix with the given row capacity, growing the file."""
+        row_bytes = self._dim * 4
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm = None
+        with open(self.matrix_path, 'ab') as f:
+            f.truncate(capacity * row_bytes)
+        self._capacity = capacity
+        self._mm = np.memmap(
+            self.matrix_path, dtype=np.float32, mode='r+',
+            shape=(capacity, self._dim)
+        )
+
+    def _get_cache_key(self, text: str) -> bytes:
         """
         Generate cache key for text.
-        
+
         Args:
             text: Text to generate key for
-            
+
         Returns:
-            Cache key (hash)
+            Cache key (raw hash digest)
         """
-        return hashlib.sha256(text.encode('utf-8')).hexdigest()
-    
+        return _hash_text(text)
+
     def get(self, text: str) -> Optional[Any]:
         """
         Get cached embedding.
-        
+
         Args:
             text: Text to get embedding for
-            
+
         Returns:
-            Cached embedding or None
+            Cached embedding (float32 view into the matrix) or None
         """
+        if self._mm is None:
+            return None
+
         cache_key = self._get_cache_key(text)
-        cache_file = self.cache_dir / f"{cache_key}.pkl"
-        
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'rb') as f:
-                    return pickle.load(f)
-            except Exception as e:
-                logger.warning(f"Error loading cache for {cache_key}: {e}")
-                return None
-        
+        try:
+            row = self._conn.execute(
+                "SELECT row FROM keys WHERE key = ?", (cache_key,)
+            ).fetchone()
+            if row is not None:
+                return self._mm[row[0]]
+        except Exception as e:
+            logger.warning(f"Error loading cached embedding: {e}")
+
         return None
-    
+
     def set(self, text: str, embedding: Any) -> None:
         """
         Cache an embedding.
-        
+
         Args:
             text: Text that was embedded
             embedding: Embedding to cache
         """
-        cache_key = self._get_cache_key(text)
-        cache_file = self.cache_dir / f"{cache_key}.pkl"
-        
         try:
-            with open(cache_file, 'wb') as f:
-                pickle.dump(embedding, f)
+            emb = np.asarray(embedding, dtype=np.float32).ravel()
+
+            if self._dim is None:
+                self._dim = emb.size
+                self._set_meta('dim', self._dim)
+                self._open_matrix(self._INITIAL_CAPACITY)
+            elif emb.size != self._dim:
+                logger.warning(
+                    f"Embedding dimension {emb.size} does not match cache dimension {self._dim}, skipping"
+                )
+                return
+
+            cache_key = self._get_cache_key(text)
+            existing = self._conn.execute(
+                "SELECT row FROM keys WHERE key = ?", (cache_key,)
+            ).fetchone()
+
+            if existing is not None:
+                self._mm[existing[0]] = emb
+            else:
+                if self._count >= self._capacity:
+                    # Grow geometrically so appends stay amortized O(1)
+                    self._open_matrix(max(self._INITIAL_CAPACITY, self._capacity * 2))
+                self._mm[self._count] = emb
+                self._conn.execute(
+                    "INSERT INTO keys (key, row) VALUES (?, ?)", (cache_key, self._count)
+                )
+                self._count += 1
+                self._set_meta('count', self._count)
+            self._conn.commit()
         except Exception as e:
-            logger.warning(f"Error caching embedding for {cache_key}: {e}")
+            logger.warning(f"Error caching embedding: {e}")
+
+    def get_matrix(self) -> Optional[np.ndarray]:
+        """
+        Get the full cached embedding matrix (rows 0..count).
+
+        Returns:
+            Contiguous (count, dim) float32 view or None if empty
+        """
+        if self._mm is None or self._count == 0:
+            return None
+        return self._mm[:self._count]
 
 
 class TokenCountCache:
-    """Cache for token counts."""
-    
+    """Cache for token counts backed by a single SQLite database."""
+
     def __init__(self, cache_dir: Optional[str] = None):
         """
         Initialize token count cache.
-        
+
         Args:
-            cache_dir: Directory for cache files (uses config if None)
+            cache_dir: Directory for the cache database (uses config if None)
         """
         config = get_config()
         if cache_dir is None:
             cache_dir = config.get("cache.token_dir", "./data/cache/tokens")
-        
+
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
-        
+        _ensure_dir(str(self.cache_dir))
+
+        # Single database instead of one file per key: avoids per-entry
+        # filesystem metadata cost, and WAL mode batches writes.
+        self.db_path = self.cache_dir / "tokens.db"
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS token_counts (
+                key BLOB PRIMARY KEY,
+                count INTEGER NOT NULL
+            )
+        """)
+        self._conn.commit()
+
         # In-memory cache for faster access
-        self.memory_cache: Dict[str, int] = {}
-        
-        logger.info(f"Token count cache initialized at {self.cache_dir}")
-    
-    def _get_cache_key(self, text: str) -> str:
-        """Generate cache key for text."""
-        return hashlib.sha256(text.encode('utf-8')).hexdigest()
-    
+        self.memory_cache: Dict[bytes, int] = {}
+
+        logger.info(f"Token count cache initialized at {self.db_path}")
+
+    def _get_cache_key(self, text: str) -> bytes:
+        """Generate cache key for text (raw digest, halves the index size vs hex)."""
+        return _hash_text(text)
+
     def get(self, text: str) -> Optional[int]:
         """
         Get cached token count.
-        
+
         Args:
             text: Text to get count for
-            
+
         Returns:
             Cached token count or None
         """
         cache_key = self._get_cache_key(text)
-        
+
         # Check memory cache first
         if cache_key in self.memory_cache:
             return self.memory_cache[cache_key]
-        
-        # Check disk cache
-        cache_file = self.cache_dir / f"{cache_key}.json"
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'r') as f:
-                    data = json.load(f)
-                    count = data.get('count')
-                    # Store in memory cache
-                    self.memory_cache[cache_key] = count
-                    return count
-            except Exception as e:
-                logger.warning(f"Error loading token cache: {e}")
-        
+
+        # Check database
+        try:
+            row = self._conn.execute(
+                "SELECT count FROM token_counts WHERE key = ?", (cache_key,)
+            ).fetchone()
+            if row is not None:
+                count = row[0]
+                # Store in memory cache
+                self.memory_cache[cache_key] = count
+                return count
+        except Exception as e:
+            logger.warning(f"Error loading token cache: {e}")
+
         return None
-    
+
     def set(self, text: str, count: int) -> None:
         """
         Cache a token count.
-        
+
         Args:
             text: Text that was counted
             count: Token count to cache
         """
         cache_key = self._get_cache_key(text)
-        
+
         # Store in memory cache
         self.memory_cache[cache_key] = count
-        
-        # Store on disk
-        cache_file = self.cache_dir / f"{cache_key}.json"
+
+        # Store in database
         try:
-            with open(cache_file, 'w') as f:
-                json.dump({'count': count}, f)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO token_counts (key, count) VALUES (?, ?)",
+                (cache_key, count)
+            )
+            self._conn.commit()
         except Exception as e:
             logger.warning(f"Error caching token count: {e}")
 
 
-# Global cache instances
-_embedding_cache: Optional[EmbeddingCache] = None
-_token_cache: Optional[TokenCountCache] = None
-
-
+@functools.cache
 def get_embedding_cache() -> EmbeddingCache:
-    """Get or create global embedding cache."""
-    global _embedding_cache
-    if _embedding_cache is None:
-        _embedding_cache = EmbeddingCache()
-    return _embedding_cache
+    """Get or create global embedding cache (thread-safe)."""
+    return EmbeddingCache()
 
 
+@functools.cache
 def get_token_cache() -> TokenCountCache:
-    """Get or create global token count cache."""
-    global _token_cache
-    if _token_cache is None:
-        _token_cache = TokenCountCache()
-    return _token_cache
+    """Get or create global token count cache (thread-safe)."""
+    return TokenCountCache()
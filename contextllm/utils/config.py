@@ -2,6 +2,7 @@
 
 import yaml
 import os
+import functools
 from pathlib import Path
 from typing import Any, Dict, Optional
 import logging
@@ -9,6 +10,13 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+@functools.cache
+def _ensure_dir(dir_path: str) -> None:
+    """Create a directory once per unique path per process (cached to skip syscalls)."""
+    Path(dir_path).mkdir(parents=True, exist_ok=True)
+    logger.debug(f"Ensured directory exists: {dir_path}")
+
+
 class Config:
     """Configuration manager for the Context Budget Optimizer."""
     
@@ -26,15 +34,17 @@ class Config:
         
         self.config_path = Path(config_path)
         self.config: Dict[str, Any] = {}
+        self._flat: Dict[str, Any] = {}
         self.load()
-    
+
     def load(self) -> None:
         """Load configuration from YAML file."""
         if not self.config_path.exists():
             logger.warning(f"Config file not found at {self.config_path}, using defaults")
             self.config = self._get_default_config()
+            self._rebuild_flat()
             return
-        
+
         try:
             with open(self.config_path, 'r', encoding='utf-8') as f:
                 self.config = yaml.safe_load(f) or {}
@@ -42,29 +52,36 @@ class Config:
         except Exception as e:
             logger.error(f"Error loading config: {e}, using defaults")
             self.config = self._get_default_config()
-    
+
+        self._rebuild_flat()
+
+    def _rebuild_flat(self) -> None:
+        """Rebuild the flattened dot-notation lookup table from self.config."""
+        flat: Dict[str, Any] = {}
+
+        def _walk(node: Dict[str, Any], prefix: str) -> None:
+            for k, value in node.items():
+                key = f"{prefix}.{k}" if prefix else k
+                flat[key] = value
+                if isinstance(value, dict):
+                    _walk(value, key)
+
+        _walk(self.config, "")
+        self._flat = flat
+
     def get(self, key: str, default: Any = None) -> Any:
         """
         Get configuration value using dot notation.
-        
+
         Args:
             key: Configuration key (e.g., "embedding.model_name")
             default: Default value if key not found
-            
+
         Returns:
             Configuration value
         """
-        keys = key.split('.')
-        value = self.config
-        
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                return default
-        
-        return value
-    
+        return self._flat.get(key, default)
+
     def set(self, key: str, value: Any) -> None:
         """
         Set configuration value using dot notation.
@@ -82,7 +99,8 @@ class Config:
             config = config[k]
         
         config[keys[-1]] = value
-    
+        self._rebuild_flat()
+
     def save(self) -> None:
         """Save current configuration to YAML file."""
         try:
@@ -119,7 +137,8 @@ class Config:
                 "min_budget": 500,
                 "max_budget": 8000,
                 "reserve_tokens": 200,
-                "relevance_weight": 1.0
+                "relevance_weight": 1.0,
+                "redundancy_weight": 0.0
             },
             "generation": {
                 "model": "mistral-small",
@@ -133,6 +152,10 @@ class Config:
             "logging": {
                 "level": "INFO",
                 "log_file": "./data/app.log"
+            },
+            "observability": {
+                "max_decisions": 10000,
+                "decision_log": "./data/decisions.jsonl"
             }
         }
     
@@ -145,18 +168,12 @@ class Config:
         ]
         
         for dir_path in directories:
-            Path(dir_path).mkdir(parents=True, exist_ok=True)
-            logger.debug(f"Ensured directory exists: {dir_path}")
-
-
-# Global config instance (lazy initialization)
-_config: Optional[Config] = None
+            _ensure_dir(str(dir_path))
 
 
+@functools.cache
 def get_config(config_path: Optional[str] = None) -> Config:
-    """Get or create global config instance."""
-    global _config
-    if _config is None:
-        _config = Config(config_path)
-        _config.ensure_directories()
-    return _config
+    """Get or create global config instance (thread-safe, cached per path)."""
+    config = Config(config_path)
+    config.ensure_directories()
+    return config
@@ -15,6 +15,12 @@ def setup_logging(log_file: Optional[str] = None, log_level: Optional[str] = Non
         log_file: Path to log file (uses config if None)
         log_level: Logging level (uses config if None)
     """
+    # Idempotent: repeated calls (e.g. CLI + server entrypoints, test loops)
+    # would otherwise silently no-op in basicConfig or double-add handlers.
+    if getattr(setup_logging, "_configured", False):
+        return
+    setup_logging._configured = True
+
     config = get_config()
     
     # Get log level
@@ -40,7 +46,8 @@ def setup_logging(log_file: Optional[str] = None, log_level: Optional[str] = Non
         format=log_format,
         datefmt=date_format,
         handlers=[
-            logging.FileHandler(log_file, encoding="utf-8"),
+            # delay=True defers the open() syscall until the first record
+            logging.FileHandler(log_file, encoding="utf-8", delay=True),
             logging.StreamHandler(sys.stdout)
         ]
     )
@@ -1,41 +1,187 @@
 """SQLite operations for query and response metadata tracking."""
 
+import atexit
 import logging
 import sqlite3
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from datetime import datetime
 from contextllm.utils.config import get_config
 
 logger = logging.getLogger(__name__)
 
 
+# Statement text hoisted to module level: sqlite3 caches prepared
+# statements per connection keyed by the exact SQL string, so reusing one
+# string object guarantees cache hits and keeps the save_* methods and
+# save_query_bundle writing byte-identical SQL.
+_SQL_UPSERT_QUERY = """
+    INSERT INTO queries
+    (id, query_text, timestamp, budget, model, temperature)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        query_text = excluded.query_text,
+        timestamp = excluded.timestamp,
+        budget = excluded.budget,
+        model = excluded.model,
+        temperature = excluded.temperature
+"""
+
+_SQL_INSERT_QUERY_CHUNK = """
+    INSERT INTO query_chunks
+    (query_id, chunk_id, similarity_score, token_count, value_score, included, inclusion_reason)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_UPSERT_RESPONSE = """
+    INSERT INTO responses
+    (id, query_id, answer_text, prompt_tokens, completion_tokens,
+     total_tokens, chunks_included_count, budget_used)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        query_id = excluded.query_id,
+        answer_text = excluded.answer_text,
+        prompt_tokens = excluded.prompt_tokens,
+        completion_tokens = excluded.completion_tokens,
+        total_tokens = excluded.total_tokens,
+        chunks_included_count = excluded.chunks_included_count,
+        budget_used = excluded.budget_used
+"""
+
+_SQL_SELECT_QUERY = "SELECT * FROM queries WHERE id = ?"
+
+_SQL_SELECT_QUERY_CHUNKS = """
+    SELECT * FROM query_chunks
+    WHERE query_id = ?
+    ORDER BY similarity_score DESC
+"""
+
+_SQL_SELECT_RESPONSE = "SELECT * FROM responses WHERE query_id = ?"
+
+_SQL_SELECT_HISTORY = """
+    SELECT q.*, r.answer_text, r.total_tokens, r.chunks_included_count
+    FROM queries q
+    LEFT JOIN responses r ON q.id = r.query_id
+    ORDER BY q.timestamp DESC
+    LIMIT ?
+"""
+
+_SQL_USAGE_STATS = """
+    SELECT
+        (SELECT COUNT(*) FROM queries),
+        (SELECT COUNT(*) FROM queries q INNER JOIN responses r ON q.id = r.query_id),
+        (SELECT SUM(total_tokens) FROM responses),
+        (SELECT AVG(chunks_included_count) FROM responses),
+        (SELECT COUNT(*) FROM queries
+         WHERE timestamp > CAST(strftime('%s', 'now', '-1 day') AS INTEGER))
+"""
+
+
+def _format_timestamp(value):
+    """Format a stored epoch timestamp to a datetime string (on read)."""
+    if isinstance(value, int):
+        return datetime.fromtimestamp(value).isoformat(sep=' ')
+    return value
+
+
 class QueryMetadataStore:
     """Stores query and response metadata in SQLite."""
-    
+
+    # Seconds between background WAL checkpoints
+    _CHECKPOINT_INTERVAL = 30.0
+
     def __init__(self, db_path: Optional[str] = None):
         """
         Initialize query metadata store.
-        
+
         Args:
             db_path: Path to SQLite database (uses config if None)
         """
         config = get_config()
         self.db_path = db_path or config.get("metadata.db_path", "./data/metadata.db")
-        
+
         # Ensure directory exists
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        
+
+        # Single long-lived connection: avoids per-call open/pragma/close
+        # thrash and keeps the page cache warm. Writes are serialized by
+        # the lock; check_same_thread is off so worker threads can read.
+        self._conn = self._connect()
+        self._lock = threading.Lock()
+        self._closed = False
+
         # Initialize schema
         self._init_schema()
-        
+
+        # Checkpoint the WAL off the write path: with autocheckpoint on,
+        # a write that pushes the WAL past the threshold stalls while the
+        # checkpoint runs inline
+        self._conn.execute("PRAGMA wal_autocheckpoint=0")
+        self._stop_checkpointer = threading.Event()
+        self._checkpointer = threading.Thread(target=self._checkpoint_loop, daemon=True)
+        self._checkpointer.start()
+
+        # Refresh planner statistics at shutdown (near-free when stats are
+        # fresh, triggers ANALYZE when they are stale)
+        atexit.register(self.close)
+
         logger.info(f"Query metadata store initialized at {self.db_path}")
-    
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a connection with the performance PRAGMA set applied.
+
+        WAL journaling with synchronous=NORMAL removes the per-commit fsync
+        that dominates write latency; the remaining PRAGMAs are per-connection
+        and must be reapplied on every new connection.
+
+        Returns:
+            Configured sqlite3 connection
+        """
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA busy_timeout=5000")
+        # Never spill the page cache to the database file mid-transaction;
+        # with a 64MB cache our write bundles comfortably fit in memory
+        conn.execute("PRAGMA cache_spill=OFF")
+        # No row_factory: plain tuples are cheapest to fetch; read methods
+        # zip column names in themselves where dicts are needed
+        return conn
+
+    def _checkpoint_loop(self) -> None:
+        """Periodically truncate the WAL from a background thread."""
+        while not self._stop_checkpointer.wait(self._CHECKPOINT_INTERVAL):
+            try:
+                with self._lock:
+                    if self._closed:
+                        return
+                    self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except Exception as e:
+                logger.warning(f"Error checkpointing metadata DB: {e}")
+
+    def close(self) -> None:
+        """Close the persistent connection, refreshing planner stats first."""
+        self._stop_checkpointer.set()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            try:
+                self._conn.execute("PRAGMA optimize")
+                self._conn.close()
+            except Exception as e:
+                logger.warning(f"Error closing metadata store: {e}")
+
     def _init_schema(self) -> None:
         """Initialize database schema for queries."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        cursor = self._conn.cursor()
+
         try:
             # Queries table
             cursor.execute("""
@@ -48,7 +194,7 @@ class QueryMetadataStore:
                     temperature REAL
                 )
             """)
-            
+
             # Query chunks table (tracks which chunks were retrieved/evaluated)
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS query_chunks (
@@ -63,7 +209,7 @@ class QueryMetadataStore:
                     FOREIGN KEY (query_id) REFERENCES queries(id)
                 )
             """)
-            
+
             # Responses table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS responses (
@@ -79,32 +225,44 @@ class QueryMetadataStore:
                     FOREIGN KEY (query_id) REFERENCES queries(id)
                 )
             """)
-            
+
             # Create indexes for better query performance
+            # Composite index satisfies both the query_id filter and the
+            # ORDER BY similarity_score DESC without a sort step; the old
+            # single-column index is redundant (same prefix)
+            cursor.execute("DROP INDEX IF EXISTS idx_query_chunks_query_id")
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_query_chunks_query_id 
-                ON query_chunks(query_id)
+                CREATE INDEX IF NOT EXISTS idx_query_chunks_qid_sim
+                ON query_chunks(query_id, similarity_score DESC)
             """)
-            
+
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_responses_query_id 
+                CREATE INDEX IF NOT EXISTS idx_responses_query_id
                 ON responses(query_id)
             """)
-            
+
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_queries_timestamp 
+                CREATE INDEX IF NOT EXISTS idx_queries_timestamp
                 ON queries(timestamp)
             """)
-            
-            conn.commit()
+
+            # One-time migration: older databases hold text datetimes
+            # from the previous datetime adapter. Integers sort below
+            # text in SQLite, so mixed types would pin legacy rows above
+            # every new row in history and break the 24h count.
+            cursor.execute("""
+                UPDATE queries
+                SET timestamp = CAST(strftime('%s', timestamp) AS INTEGER)
+                WHERE typeof(timestamp) = 'text'
+            """)
+
+            self._conn.commit()
             logger.debug("Query metadata schema initialized")
-            
+
         except Exception as e:
             logger.error(f"Error initializing query metadata schema: {e}")
             raise
-        finally:
-            conn.close()
-    
+
     def save_query(
         self,
         query_id: str,
@@ -115,7 +273,7 @@ class QueryMetadataStore:
     ) -> None:
         """
         Save a query record.
-        
+
         Args:
             query_id: Unique query ID
             query_text: Query text
@@ -123,25 +281,23 @@ class QueryMetadataStore:
             model: Model name
             temperature: Temperature used
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO queries 
-                (id, query_text, timestamp, budget, model, temperature)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (query_id, query_text, datetime.now(), budget, model, temperature))
-            
-            conn.commit()
+            # The connection context manager commits on success and rolls
+            # back on error, so a failed write never leaves an open
+            # transaction holding the write lock
+            with self._lock, self._conn:
+                # Upsert: unlike INSERT OR REPLACE, this updates the row
+                # in place instead of delete+reinsert, avoiding index churn
+                self._conn.execute(
+                    _SQL_UPSERT_QUERY,
+                    (query_id, query_text, int(time.time()), budget, model, temperature)
+                )
             logger.debug(f"Saved query: {query_id}")
-            
+
         except Exception as e:
             logger.error(f"Error saving query: {e}")
             raise
-        finally:
-            conn.close()
-    
+
     def save_query_chunks(
         self,
         query_id: str,
@@ -150,7 +306,7 @@ class QueryMetadataStore:
     ) -> None:
         """
         Save chunk evaluation data for a query.
-        
+
         Args:
             query_id: Query ID
             chunks: List of chunks (all evaluated chunks)
@@ -158,42 +314,36 @@ class QueryMetadataStore:
         """
         if not chunks:
             return
-        
+
         # Create a set of selected chunk IDs if optimization result provided
         selected_ids = set()
         if optimization_result:
             selected = optimization_result.get('selected_chunks', [])
             selected_ids = {chunk.get('chunk_id', '') for chunk in selected}
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+
+        # Build all rows up front so a single prepared statement is reused
+        rows = [
+            (
+                query_id,
+                chunk.get('chunk_id', ''),
+                chunk.get('similarity_score', 0),
+                chunk.get('token_count', 0),
+                chunk.get('value_per_token', 0),
+                chunk.get('chunk_id', '') in selected_ids if optimization_result else False,
+                chunk.get('metadata', {}).get('inclusion_reason', 'not_optimized')
+            )
+            for chunk in chunks
+        ]
+
         try:
-            for chunk in chunks:
-                chunk_id = chunk.get('chunk_id', '')
-                similarity_score = chunk.get('similarity_score', 0)
-                token_count = chunk.get('token_count', 0)
-                value_score = chunk.get('value_per_token', 0)
-                
-                # Determine if included
-                included = chunk_id in selected_ids if optimization_result else False
-                inclusion_reason = chunk.get('metadata', {}).get('inclusion_reason', 'not_optimized')
-                
-                cursor.execute("""
-                    INSERT INTO query_chunks 
-                    (query_id, chunk_id, similarity_score, token_count, value_score, included, inclusion_reason)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (query_id, chunk_id, similarity_score, token_count, value_score, included, inclusion_reason))
-            
-            conn.commit()
+            with self._lock, self._conn:
+                self._conn.executemany(_SQL_INSERT_QUERY_CHUNK, rows)
             logger.debug(f"Saved {len(chunks)} query chunks for query {query_id}")
-            
+
         except Exception as e:
             logger.error(f"Error saving query chunks: {e}")
             raise
-        finally:
-            conn.close()
-    
+
     def save_response(
         self,
         response_id: str,
@@ -205,7 +355,7 @@ class QueryMetadataStore:
     ) -> None:
         """
         Save a response record.
-        
+
         Args:
             response_id: Unique response ID
             query_id: Associated query ID
@@ -214,193 +364,227 @@ class QueryMetadataStore:
             chunks_included_count: Number of chunks included
             budget_used: Percentage of budget used
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO responses 
-                (id, query_id, answer_text, prompt_tokens, completion_tokens, 
-                 total_tokens, chunks_included_count, budget_used)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                response_id,
-                query_id,
-                answer_text,
-                usage.get('prompt_tokens', 0),
-                usage.get('completion_tokens', 0),
-                usage.get('total_tokens', 0),
-                chunks_included_count,
-                budget_used
-            ))
-            
-            conn.commit()
+            with self._lock, self._conn:
+                self._conn.execute(_SQL_UPSERT_RESPONSE, (
+                    response_id,
+                    query_id,
+                    answer_text,
+                    usage.get('prompt_tokens', 0),
+                    usage.get('completion_tokens', 0),
+                    usage.get('total_tokens', 0),
+                    chunks_included_count,
+                    budget_used
+                ))
             logger.debug(f"Saved response: {response_id}")
-            
+
         except Exception as e:
             logger.error(f"Error saving response: {e}")
             raise
-        finally:
-            conn.close()
-    
+
+    def save_query_bundle(
+        self,
+        query_id: str,
+        query_text: str,
+        chunks: List[Dict[str, Any]],
+        response_id: str,
+        answer_text: str,
+        usage: Dict[str, int],
+        chunks_included_count: int,
+        budget: Optional[int] = None,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        budget_used: Optional[float] = None,
+        optimization_result: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Save query, chunk evaluations, and response in one transaction.
+
+        Writing all three tables under a single BEGIN IMMEDIATE costs one
+        fsync instead of three, which is the dominant per-query write cost.
+
+        Args:
+            query_id: Unique query ID
+            query_text: Query text
+            chunks: List of chunks (all evaluated chunks)
+            response_id: Unique response ID
+            answer_text: Generated answer text
+            usage: Token usage dictionary
+            chunks_included_count: Number of chunks included
+            budget: Token budget used
+            model: Model name
+            temperature: Temperature used
+            budget_used: Percentage of budget used
+            optimization_result: Optional optimization result to determine inclusion
+        """
+        selected_ids = set()
+        if optimization_result:
+            selected = optimization_result.get('selected_chunks', [])
+            selected_ids = {chunk.get('chunk_id', '') for chunk in selected}
+
+        chunk_rows = [
+            (
+                query_id,
+                chunk.get('chunk_id', ''),
+                chunk.get('similarity_score', 0),
+                chunk.get('token_count', 0),
+                chunk.get('value_per_token', 0),
+                chunk.get('chunk_id', '') in selected_ids if optimization_result else False,
+                chunk.get('metadata', {}).get('inclusion_reason', 'not_optimized')
+            )
+            for chunk in chunks
+        ]
+
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute(
+                        _SQL_UPSERT_QUERY,
+                        (query_id, query_text, int(time.time()), budget, model, temperature)
+                    )
+
+                    self._conn.executemany(_SQL_INSERT_QUERY_CHUNK, chunk_rows)
+
+                    self._conn.execute(_SQL_UPSERT_RESPONSE, (
+                        response_id,
+                        query_id,
+                        answer_text,
+                        usage.get('prompt_tokens', 0),
+                        usage.get('completion_tokens', 0),
+                        usage.get('total_tokens', 0),
+                        chunks_included_count,
+                        budget_used
+                    ))
+
+                    self._conn.commit()
+                except Exception:
+                    self._conn.rollback()
+                    raise
+            logger.debug(f"Saved query bundle: {query_id} ({len(chunk_rows)} chunks)")
+
+        except Exception as e:
+            logger.error(f"Error saving query bundle: {e}")
+            raise
+
     def get_query(self, query_id: str) -> Optional[Dict[str, Any]]:
         """
         Get a query record.
-        
+
         Args:
             query_id: Query ID
-            
+
         Returns:
             Query dictionary or None
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("SELECT * FROM queries WHERE id = ?", (query_id,))
+            cursor = self._conn.execute(_SQL_SELECT_QUERY, (query_id,))
             row = cursor.fetchone()
-            
+
             if row:
-                return dict(row)
+                query = dict(zip([d[0] for d in cursor.description], row))
+                query['timestamp'] = _format_timestamp(query.get('timestamp'))
+                return query
             return None
-            
+
         except Exception as e:
             logger.error(f"Error getting query: {e}")
             return None
-        finally:
-            conn.close()
-    
+
     def get_query_chunks(self, query_id: str) -> List[Dict[str, Any]]:
         """
         Get all chunks for a query.
-        
+
         Args:
             query_id: Query ID
-            
+
         Returns:
             List of chunk dictionaries
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("""
-                SELECT * FROM query_chunks 
-                WHERE query_id = ? 
-                ORDER BY similarity_score DESC
-            """, (query_id,))
+            cursor = self._conn.execute(_SQL_SELECT_QUERY_CHUNKS, (query_id,))
             rows = cursor.fetchall()
-            
-            return [dict(row) for row in rows]
-            
+
+            # Build dicts from one shared column list instead of paying the
+            # sqlite3.Row factory per fetched row
+            cols = [d[0] for d in cursor.description]
+            return [dict(zip(cols, row)) for row in rows]
+
         except Exception as e:
             logger.error(f"Error getting query chunks: {e}")
             return []
-        finally:
-            conn.close()
-    
+
     def get_response(self, query_id: str) -> Optional[Dict[str, Any]]:
         """
         Get response for a query.
-        
+
         Args:
             query_id: Query ID
-            
+
         Returns:
             Response dictionary or None
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("SELECT * FROM responses WHERE query_id = ?", (query_id,))
+            cursor = self._conn.execute(_SQL_SELECT_RESPONSE, (query_id,))
             row = cursor.fetchone()
-            
+
             if row:
-                return dict(row)
+                return dict(zip([d[0] for d in cursor.description], row))
             return None
-            
+
         except Exception as e:
             logger.error(f"Error getting response: {e}")
             return None
-        finally:
-            conn.close()
-    
+
     def get_query_history(self, limit: int = 50) -> List[Dict[str, Any]]:
         """
         Get recent query history.
-        
+
         Args:
             limit: Maximum number of queries to return
-            
+
         Returns:
             List of query dictionaries with response info
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("""
-                SELECT q.*, r.answer_text, r.total_tokens, r.chunks_included_count
-                FROM queries q
-                LEFT JOIN responses r ON q.id = r.query_id
-                ORDER BY q.timestamp DESC
-                LIMIT ?
-            """, (limit,))
-            
+            cursor = self._conn.execute(_SQL_SELECT_HISTORY, (limit,))
+
             rows = cursor.fetchall()
-            return [dict(row) for row in rows]
-            
+            cols = [d[0] for d in cursor.description]
+            history = [dict(zip(cols, row)) for row in rows]
+            # Timestamps are stored as epoch ints; format them to the
+            # datetime strings the API returned before
+            for entry in history:
+                entry['timestamp'] = _format_timestamp(entry.get('timestamp'))
+            return history
+
         except Exception as e:
             logger.error(f"Error getting query history: {e}")
             return []
-        finally:
-            conn.close()
-    
+
     def get_usage_statistics(self) -> Dict[str, Any]:
         """
         Get usage statistics.
-        
+
         Returns:
             Dictionary with usage statistics
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            # Total queries
-            cursor.execute("SELECT COUNT(*) FROM queries")
-            total_queries = cursor.fetchone()[0] or 0
-            
-            # Successful queries (with responses)
-            cursor.execute("SELECT COUNT(*) FROM queries q INNER JOIN responses r ON q.id = r.query_id")
-            successful_queries = cursor.fetchone()[0] or 0
-            
-            # Success rate
+            # One round trip: all aggregates in a single statement so SQLite
+            # dispatches one query plan instead of six
+            cursor = self._conn.execute(_SQL_USAGE_STATS)
+            row = cursor.fetchone()
+
+            total_queries = row[0] or 0
+            successful_queries = row[1] or 0
+            total_tokens = row[2] or 0
+            avg_chunks = row[3] or 0
+            recent_queries = row[4] or 0
+
+            # Derived metrics computed in Python
             success_rate = (successful_queries / total_queries * 100) if total_queries > 0 else 0
-            
-            # Total tokens used
-            cursor.execute("SELECT SUM(total_tokens) FROM responses")
-            total_tokens = cursor.fetchone()[0] or 0
-            
-            # Average tokens per query
             avg_tokens = (total_tokens / successful_queries) if successful_queries > 0 else 0
-            
-            # Average chunks per query
-            cursor.execute("SELECT AVG(chunks_included_count) FROM responses")
-            avg_chunks = cursor.fetchone()[0] or 0
-            
-            # Recent activity (last 24 hours)
-            cursor.execute("""
-                SELECT COUNT(*) FROM queries 
-                WHERE timestamp > datetime('now', '-1 day')
-            """)
-            recent_queries = cursor.fetchone()[0] or 0
-            
+
             return {
                 'total_queries': total_queries,
                 'successful_queries': successful_queries,
@@ -411,9 +595,7 @@ class QueryMetadataStore:
                 'avg_chunks_per_query': round(avg_chunks, 2),
                 'recent_queries_24h': recent_queries
             }
-            
+
         except Exception as e:
             logger.error(f"Error getting usage statistics: {e}")
             return {}
-        finally:
-            conn.close()
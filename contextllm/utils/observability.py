@@ -1,20 +1,114 @@
 """Observability utilities for tracking decisions and system behavior."""
 
+import atexit
+import collections
+import json
 import logging
+import time
+from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from contextllm.utils.config import get_config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
+# Fixed-slot records for per-chunk log entries: a namedtuple costs a
+# fraction of the memory of an equivalent dict; records are converted to
+# dicts only when a decision is serialized or read out
+ChunkRecord = collections.namedtuple(
+    'ChunkRecord', 'chunk_id value_per_token relevance_score token_count'
+)
+ExcludedChunkRecord = collections.namedtuple(
+    'ExcludedChunkRecord', 'chunk_id reason value_per_token'
+)
+
+
+def _format_timestamp(ts_ns: int) -> str:
+    """Format a nanosecond timestamp to ISO-8601 (applied lazily on read)."""
+    return datetime.fromtimestamp(ts_ns / 1e9).isoformat()
+
+
+def _externalize(decision: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a stored decision to a consumer-friendly dict."""
+    out = {**decision, 'timestamp': _format_timestamp(decision['timestamp'])}
+    details = out.get('selection_details')
+    if details:
+        out['selection_details'] = {
+            'selected': [r._asdict() for r in details['selected']],
+            'excluded': [r._asdict() for r in details['excluded']]
+        }
+    return out
+
+
+def _dumps(decision: Dict[str, Any]) -> bytes:
+    """Serialize a decision to JSON bytes (orjson when available)."""
+    # orjson refuses tuple subclasses, so convert the per-chunk records
+    # to dicts first; doing it here keeps the sink format identical on
+    # both serializer paths
+    details = decision.get('selection_details')
+    if details is not None:
+        decision = {
+            **decision,
+            'selection_details': {
+                'selected': [r._asdict() for r in details['selected']],
+                'excluded': [r._asdict() for r in details['excluded']]
+            }
+        }
+    if orjson is not None:
+        return orjson.dumps(decision)
+    return json.dumps(decision).encode('utf-8')
+
+
 class DecisionLogger:
     """Logs optimization and retrieval decisions for explainability."""
-    
+
     def __init__(self):
         """Initialize decision logger."""
-        self.decisions = []
+        config = get_config()
+
+        # Bounded: an unbounded list grows forever in long-running servers
+        max_decisions = config.get("observability.max_decisions", 10000)
+        self.decisions = collections.deque(maxlen=max_decisions)
+
+        # Stream each decision to a JSONL file so history survives the
+        # deque bound; buffered so hot paths don't block on disk
+        self._sink = None
+        sink_path = config.get("observability.decision_log", "./data/decisions.jsonl")
+        if sink_path:
+            try:
+                Path(sink_path).parent.mkdir(parents=True, exist_ok=True)
+                self._sink = open(sink_path, 'ab', buffering=1 << 20)
+                # The buffer can hold up to 1MB of decisions; flush it
+                # even on unclean interpreter exits
+                atexit.register(self.close)
+            except Exception as e:
+                logger.warning(f"Could not open decision log sink {sink_path}: {e}")
+
         logger.debug("Decision logger initialized")
+
+    def _record(self, decision: Dict[str, Any]) -> None:
+        """Append a decision to the in-memory deque and the JSONL sink."""
+        if self._sink is not None:
+            try:
+                self._sink.write(_dumps(decision) + b'\n')
+            except Exception as e:
+                logger.warning(f"Error writing decision to sink: {e}")
+        self.decisions.append(decision)
+
+    def close(self) -> None:
+        """Flush and close the JSONL sink."""
+        if self._sink is not None:
+            try:
+                self._sink.close()
+            except Exception as e:
+                logger.warning(f"Error closing decision sink: {e}")
+            self._sink = None
     
     def log_retrieval(
         self,
@@ -31,7 +125,7 @@ class DecisionLogger:
             top_k: Number of chunks requested
         """
         decision = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': time.time_ns(),
             'type': 'retrieval',
             'query': query,
             'top_k': top_k,
@@ -46,7 +140,7 @@ class DecisionLogger:
             ]
         }
         
-        self.decisions.append(decision)
+        self._record(decision)
         logger.debug(f"Logged retrieval decision: {len(chunks_retrieved)} chunks for query")
     
     def log_optimization(
@@ -67,7 +161,7 @@ class DecisionLogger:
         excluded = optimization_result.get('excluded_chunks', [])
         
         decision = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': time.time_ns(),
             'type': 'optimization',
             'query': query,
             'chunks_evaluated': len(chunks_evaluated),
@@ -77,26 +171,26 @@ class DecisionLogger:
             'budget_used': optimization_result.get('budget_used', 0),
             'selection_details': {
                 'selected': [
-                    {
-                        'chunk_id': chunk.get('chunk_id', ''),
-                        'value_per_token': chunk.get('value_per_token', 0),
-                        'relevance_score': chunk.get('relevance_score', 0),
-                        'token_count': chunk.get('token_count', 0)
-                    }
+                    ChunkRecord(
+                        chunk.get('chunk_id', ''),
+                        chunk.get('value_per_token', 0),
+                        chunk.get('relevance_score', 0),
+                        chunk.get('token_count', 0)
+                    )
                     for chunk in selected[:10]  # Log top 10
                 ],
                 'excluded': [
-                    {
-                        'chunk_id': chunk.get('chunk_id', ''),
-                        'reason': chunk.get('metadata', {}).get('inclusion_reason', 'unknown'),
-                        'value_per_token': chunk.get('value_per_token', 0)
-                    }
+                    ExcludedChunkRecord(
+                        chunk.get('chunk_id', ''),
+                        chunk.get('metadata', {}).get('inclusion_reason', 'unknown'),
+                        chunk.get('value_per_token', 0)
+                    )
                     for chunk in excluded[:5]  # Log top 5 excluded
                 ]
             }
         }
         
-        self.decisions.append(decision)
+        self._record(decision)
         logger.debug(f"Logged optimization decision: {len(selected)} selected, {len(excluded)} excluded")
     
     def log_generation(
@@ -112,7 +206,7 @@ class DecisionLogger:
             generation_result: Result from generator
         """
         decision = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': time.time_ns(),
             'type': 'generation',
             'query': query,
             'model': generation_result.get('model', 'unknown'),
@@ -121,7 +215,7 @@ class DecisionLogger:
             'answer_length': len(generation_result.get('answer', ''))
         }
         
-        self.decisions.append(decision)
+        self._record(decision)
         logger.debug(f"Logged generation decision: {generation_result.get('chunks_used', 0)} chunks used")
     
     def get_decisions(self, decision_type: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -132,15 +226,26 @@ class DecisionLogger:
             decision_type: Optional filter by type ('retrieval', 'optimization', 'generation')
             
         Returns:
-            List of decision dictionaries
+            List of decision dictionaries (timestamps formatted to ISO-8601)
         """
         if decision_type:
-            return [d for d in self.decisions if d.get('type') == decision_type]
-        return self.decisions
+            decisions = [d for d in self.decisions if d.get('type') == decision_type]
+        else:
+            decisions = list(self.decisions)
+
+        # Raw timestamps and namedtuple records are kept on the hot path;
+        # convert to consumer-friendly dicts only here, on read
+        return [_externalize(d) for d in decisions]
     
     def clear(self) -> None:
-        """Clear all logged decisions."""
+        """Clear all logged decisions, including the JSONL sink."""
         self.decisions.clear()
+        if self._sink is not None:
+            try:
+                self._sink.flush()
+                self._sink.truncate(0)
+            except Exception as e:
+                logger.warning(f"Error truncating decision sink: {e}")
         logger.debug("Cleared all decisions")
 
 
@@ -1,20 +1,32 @@
 """Progress bar utilities for long operations."""
 
+import functools
 import logging
 import sys
+import time
 from typing import Optional, Callable
 from contextllm.utils.config import get_config
 
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between redraws (~20Hz); terminal writes are syscalls
+_DRAW_INTERVAL = 0.05
+
+
+@functools.cache
+def _show_progress() -> bool:
+    """Resolve ui.show_progress once per process; one bar is created per
+    file during ingest, so the config walk would otherwise repeat per bar."""
+    return get_config().get("ui.show_progress", True)
+
 
 class ProgressBar:
     """Simple progress bar for terminal output."""
-    
+
     def __init__(self, total: int, desc: str = "Processing", width: int = 50):
         """
         Initialize progress bar.
-        
+
         Args:
             total: Total number of items
             desc: Description text
@@ -24,33 +36,45 @@ class ProgressBar:
         self.desc = desc
         self.width = width
         self.current = 0
-        self._enabled = get_config().get("ui.show_progress", True)
-    
+        self._enabled = _show_progress()
+        self._last_draw = 0.0
+        # Precomputed bar characters: slicing these is a single memcpy
+        # instead of two string multiplications per draw
+        self._full = '█' * width
+        self._empty = '░' * width
+
     def update(self, n: int = 1) -> None:
         """
         Update progress by n items.
-        
+
         Args:
             n: Number of items completed
         """
         if not self._enabled:
             return
-        
+
         self.current = min(self.current + n, self.total)
+
+        # Throttle redraws: drawing every increment serializes the caller
+        # on terminal I/O for large totals
+        now = time.monotonic()
+        if self.current < self.total and now - self._last_draw < _DRAW_INTERVAL:
+            return
+        self._last_draw = now
         self._draw()
-    
+
     def _draw(self) -> None:
         """Draw the progress bar."""
         if self.total == 0:
             return
-        
+
         percent = self.current / self.total
         filled = int(self.width * percent)
-        bar = '█' * filled + '░' * (self.width - filled)
-        
+        bar = self._full[:filled] + self._empty[:self.width - filled]
+
         sys.stdout.write(f'\r{self.desc}: [{bar}] {self.current}/{self.total} ({percent*100:.1f}%)')
         sys.stdout.flush()
-        
+
         if self.current >= self.total:
             sys.stdout.write('\n')
             sys.stdout.flush()
@@ -73,6 +97,6 @@ def create_progress_bar(total: int, desc: str = "Processing") -> Optional[Progre
     Returns:
         ProgressBar instance or None if disabled
     """
-    if get_config().get("ui.show_progress", True):
+    if _show_progress():
         return ProgressBar(total, desc)
     return None
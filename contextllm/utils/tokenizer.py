@@ -1,65 +1,80 @@
 """Token counting utilities using Mistral tokenizer."""
 
+import functools
 import logging
-from typing import List, Optional
-from transformers import AutoTokenizer
+import os
+from typing import Dict, List, Optional
+
+# Let the Rust backend parallelize encode_batch across cores; it runs
+# outside the GIL, and we never fork workers after tokenizing, so the
+# fork-safety warning this guards against does not apply here
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
+
+import numpy as np
+
 from contextllm.utils.cache import get_token_cache
 
 logger = logging.getLogger(__name__)
 
-# Global tokenizer instance (lazy initialization)
-_tokenizer: Optional[AutoTokenizer] = None
+@functools.lru_cache(maxsize=8)
+def get_tokenizer(model_name: str = "mistralai/Mistral-7B-v0.1") -> "AutoTokenizer":
+    """
+    Get or create Mistral tokenizer instance, cached per model name.
 
+    Loading a tokenizer costs tens of milliseconds; the lru_cache makes
+    every call after the first an O(1) lookup. Caching by model_name also
+    means asking for a different model actually loads it, instead of
+    returning whichever tokenizer happened to load first.
+
+    transformers is imported here rather than at module level: it is a
+    heavyweight import, and callers that only chunk or use the character
+    heuristics never need it.
 
-def get_tokenizer(model_name: str = "mistralai/Mistral-7B-v0.1") -> AutoTokenizer:
-    """
-    Get or create Mistral tokenizer instance.
-    
     Args:
         model_name: HuggingFace model name for Mistral tokenizer
-        
+
     Returns:
         AutoTokenizer instance
     """
-    global _tokenizer
-    if _tokenizer is None:
-        try:
-            logger.info(f"Loading tokenizer: {model_name}")
-            _tokenizer = AutoTokenizer.from_pretrained(model_name)
-            logger.info("Tokenizer loaded successfully")
-        except Exception as e:
-            logger.error(f"Error loading tokenizer: {e}")
-            # Fallback to a simpler tokenizer if Mistral model not available
-            logger.warning("Falling back to GPT-2 tokenizer for token counting")
-            _tokenizer = AutoTokenizer.from_pretrained("gpt2")
-    return _tokenizer
+    from transformers import AutoTokenizer
 
+    try:
+        logger.info(f"Loading tokenizer: {model_name}")
+        tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+        logger.info("Tokenizer loaded successfully")
+        return tokenizer
+    except Exception as e:
+        logger.error(f"Error loading tokenizer: {e}")
+        # Fallback to a simpler tokenizer if Mistral model not available
+        logger.warning("Falling back to GPT-2 tokenizer for token counting")
+        return AutoTokenizer.from_pretrained("gpt2", use_fast=True)
 
-def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+
+@functools.lru_cache(maxsize=65536)
+def _count_tokens_cached(text: str, model_name: Optional[str]) -> int:
     """
-    Count tokens in a text string using Mistral tokenizer (with caching).
-    
-    Args:
-        text: Text to count tokens for
-        model_name: Optional model name (uses default if None)
-        
-    Returns:
-        Number of tokens
+    Count tokens for a single non-empty text, memoized in-process.
+
+    The lru_cache makes repeat counts of identical texts (system prompts,
+    recurring chunks) an O(1) lookup; the persistent token cache still
+    backs it across processes.
     """
-    if not text:
-        return 0
-    
-    # Check cache first
     cache = get_token_cache()
     cached = cache.get(text)
     if cached is not None:
         return cached
-    
+
     try:
         tokenizer = get_tokenizer(model_name) if model_name else get_tokenizer()
-        tokens = tokenizer.encode(text, add_special_tokens=False)
-        count = len(tokens)
-        
+        # Go straight to the Rust backend when available: skips the Python
+        # post-processing in PreTrainedTokenizerBase.encode, and we only
+        # need the count anyway
+        backend = getattr(tokenizer, 'backend_tokenizer', None)
+        if backend is not None:
+            count = len(backend.encode(text, add_special_tokens=False).ids)
+        else:
+            count = len(tokenizer.encode(text, add_special_tokens=False))
+
         # Cache it
         cache.set(text, count)
         return count
@@ -72,52 +87,171 @@ def count_tokens(text: str, model_name: Optional[str] = None) -> int:
         return count
 
 
+def clear_token_count_cache() -> None:
+    """
+    Clear the in-process token count memo.
+
+    The persistent on-disk cache is left intact; this only resets the
+    lru_cache layer so tests can exercise the uncached path.
+    """
+    _count_tokens_cached.cache_clear()
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """
+    Count tokens in a text string using Mistral tokenizer (with caching).
+
+    Args:
+        text: Text to count tokens for
+        model_name: Optional model name (uses default if None)
+
+    Returns:
+        Number of tokens
+    """
+    if not text:
+        return 0
+
+    return _count_tokens_cached(text, model_name)
+
+
+def count_tokens_fast(text: str) -> int:
+    """
+    Cheap token estimate without invoking the tokenizer.
+
+    Uses the same 1 token ≈ 4 characters heuristic as the error fallback.
+    Good enough for budget pre-filtering where exact counts do not matter;
+    avoids the tokenizer dispatch entirely.
+
+    Args:
+        text: Text to estimate tokens for
+
+    Returns:
+        Estimated number of tokens
+    """
+    return len(text) // 4
+
+
 def count_tokens_batch(texts: List[str], model_name: Optional[str] = None) -> List[int]:
     """
     Count tokens for multiple texts efficiently.
-    
+
     Args:
         texts: List of texts to count tokens for
         model_name: Optional model name (uses default if None)
-        
+
     Returns:
         List of token counts
     """
     if not texts:
         return []
-    
-    try:
-        tokenizer = get_tokenizer(model_name) if model_name else get_tokenizer()
-        # Batch encode for efficiency
-        encoded = tokenizer(texts, add_special_tokens=False, padding=False, truncation=False)
-        return [len(tokens) for tokens in encoded['input_ids']]
-    except Exception as e:
-        logger.error(f"Error counting tokens in batch: {e}")
-        # Fallback: rough estimate
-        return [len(text) // 4 for text in texts]
 
+    # Partition into cache hits and misses; only misses go to the encoder.
+    # Hot lookups are bound to locals so the per-text loop does LOAD_FAST
+    # instead of attribute resolution on every iteration.
+    cache = get_token_cache()
+    cache_get = cache.get
+    counts: List[Optional[int]] = [None] * len(texts)
+    miss_texts: List[str] = []
+    miss_indices: List[int] = []
+    miss_text_append = miss_texts.append
+    miss_index_append = miss_indices.append
+
+    for i, text in enumerate(texts):
+        # Empty strings are zero tokens by definition: skip the cache and
+        # encoder entirely, mirroring count_tokens' first-line fast path
+        if not text:
+            counts[i] = 0
+            continue
+        cached = cache_get(text)
+        if cached is not None:
+            counts[i] = cached
+        else:
+            miss_text_append(text)
+            miss_index_append(i)
+
+    if miss_texts:
+        # Encode each distinct text once: retrieval batches often repeat
+        # passages, so map every miss to a slot in the unique list and
+        # scatter the counts back afterwards
+        unique_slots: Dict[str, int] = {}
+        slot_of_miss = [unique_slots.setdefault(text, len(unique_slots)) for text in miss_texts]
+        unique_texts = list(unique_slots)
+
+        try:
+            tokenizer = get_tokenizer(model_name) if model_name else get_tokenizer()
+            # Batch encode for efficiency; the Rust backend parallelizes the
+            # batch internally and skips the Python wrapper overhead
+            backend = getattr(tokenizer, 'backend_tokenizer', None)
+            if backend is not None:
+                encodings = backend.encode_batch(unique_texts, add_special_tokens=False)
+                unique_counts = [len(enc.ids) for enc in encodings]
+            else:
+                encoded = tokenizer(unique_texts, add_special_tokens=False, padding=False, truncation=False)
+                unique_counts = [len(tokens) for tokens in encoded['input_ids']]
+        except Exception as e:
+            logger.error(f"Error counting tokens in batch: {e}")
+            # Fallback: rough estimate
+            unique_counts = [len(text) // 4 for text in unique_texts]
+
+        cache_set = cache.set
+        for text, count in zip(unique_texts, unique_counts):
+            cache_set(text, count)
+        for i, slot in zip(miss_indices, slot_of_miss):
+            counts[i] = unique_counts[slot]
 
-def estimate_tokens_for_prompt(system_prompt: str, user_prompt: str, chunks: List[str]) -> int:
+    return counts
+
+
+def count_tokens_batch_array(texts: List[str], model_name: Optional[str] = None) -> np.ndarray:
+    """
+    Count tokens for multiple texts, returned as an int64 numpy array.
+
+    Callers that go on to vectorize (budget cumsums, value-per-token
+    math) get an ndarray directly instead of converting a Python list at
+    every call site. count_tokens_batch keeps returning plain ints for
+    callers that store counts in chunk metadata.
+
+    Args:
+        texts: List of texts to count tokens for
+        model_name: Optional model name (uses default if None)
+
+    Returns:
+        Token counts as a 1-D int64 array aligned to the input order
+    """
+    counts = count_tokens_batch(texts, model_name)
+    return np.fromiter(counts, dtype=np.int64, count=len(counts))
+
+
+def estimate_tokens_for_prompt(
+    system_prompt: str,
+    user_prompt: str,
+    chunks: List[str],
+    fast: bool = False
+) -> int:
     """
     Estimate total tokens for a complete prompt including system message, user query, and context chunks.
-    
+
     Args:
         system_prompt: System instruction text
         user_prompt: User query text
         chunks: List of context chunks to include
-        
+        fast: If True, use the cheap character heuristic for chunks and
+            exact counts only for the system and user prompts
+
     Returns:
         Total estimated token count
     """
-    # Count system prompt
-    system_tokens = count_tokens(system_prompt)
-    
-    # Count user prompt
-    user_tokens = count_tokens(user_prompt)
-    
-    # Count chunks
-    chunk_tokens = sum(count_tokens(chunk) for chunk in chunks)
-    
+    if fast:
+        # Exact counts only for the two prompts; cheap heuristic for chunks
+        system_tokens, user_tokens = count_tokens_batch([system_prompt, user_prompt])
+        chunk_tokens = sum(count_tokens_fast(chunk) for chunk in chunks)
+    else:
+        # One batch call: the backend encodes all parts in a single pass
+        # instead of N sequential encoder round-trips
+        counts = count_tokens_batch([system_prompt, user_prompt, *chunks])
+        system_tokens, user_tokens = counts[0], counts[1]
+        chunk_tokens = sum(counts[2:])
+
     # Add overhead for formatting (markers, separators, etc.)
     # Rough estimate: ~10 tokens per chunk for formatting
     formatting_overhead = len(chunks) * 10
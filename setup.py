@@ -24,7 +24,7 @@ setup(
     author_email="your.email@example.com",
     url="https://github.com/yourusername/contextllm",
     packages=find_packages(exclude=["tests", "tests.*"]),
-    python_requires=">=3.8",
+    python_requires=">=3.9",
     install_requires=requirements,
     classifiers=[
         "Development Status :: 3 - Alpha",
@@ -32,7 +32,6 @@ setup(
         "Intended Audience :: Education",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
@@ -0,0 +1,58 @@
+"""Tests for the embedding cache."""
+
+import numpy as np
+
+from contextllm.utils.cache import EmbeddingCache
+
+
+def test_embedding_cache_set_get(tmp_path):
+    """Test basic set/get round-trip and a miss."""
+    cache = EmbeddingCache(cache_dir=str(tmp_path))
+
+    embedding = np.array([0.1, 0.2, 0.3], dtype=np.float32)
+    cache.set("hello", embedding)
+
+    cached = cache.get("hello")
+    assert cached is not None
+    assert np.allclose(cached, embedding)
+
+    assert cache.get("never seen") is None
+
+
+def test_embedding_cache_rejects_dimension_mismatch(tmp_path):
+    """Test that a wrong-dimension embedding is skipped, not stored."""
+    cache = EmbeddingCache(cache_dir=str(tmp_path))
+
+    cache.set("three", np.zeros(3, dtype=np.float32))
+    cache.set("four", np.zeros(4, dtype=np.float32))
+
+    assert cache.get("three") is not None
+    assert cache.get("four") is None
+
+
+def test_embedding_cache_grows_past_initial_capacity(tmp_path, monkeypatch):
+    """Test that the matrix grows and keeps earlier entries intact."""
+    monkeypatch.setattr(EmbeddingCache, "_INITIAL_CAPACITY", 4)
+    cache = EmbeddingCache(cache_dir=str(tmp_path))
+
+    for i in range(10):
+        cache.set(f"text-{i}", np.full(3, float(i), dtype=np.float32))
+
+    matrix = cache.get_matrix()
+    assert matrix is not None
+    assert matrix.shape == (10, 3)
+    for i in range(10):
+        assert np.allclose(cache.get(f"text-{i}"), np.full(3, float(i)))
+
+
+def test_embedding_cache_reopen(tmp_path):
+    """Test that entries persist across cache instances."""
+    cache = EmbeddingCache(cache_dir=str(tmp_path))
+    embedding = np.array([1.0, 2.0], dtype=np.float32)
+    cache.set("persisted", embedding)
+
+    reopened = EmbeddingCache(cache_dir=str(tmp_path))
+    cached = reopened.get("persisted")
+    assert cached is not None
+    assert np.allclose(cached, embedding)
+    assert reopened.get_matrix().shape == (1, 2)
@@ -0,0 +1,94 @@
+"""Tests for query metadata storage."""
+
+import pytest
+from contextllm.utils.metadata_db import QueryMetadataStore
+
+
+def _make_chunks():
+    """Build a pair of evaluated chunks for bundle tests."""
+    return [
+        {
+            'chunk_id': 'c1',
+            'similarity_score': 0.9,
+            'token_count': 10,
+            'value_per_token': 0.09,
+            'metadata': {'inclusion_reason': 'fits_in_budget'}
+        },
+        {
+            'chunk_id': 'c2',
+            'similarity_score': 0.5,
+            'token_count': 20,
+            'value_per_token': 0.025,
+            'metadata': {'inclusion_reason': 'budget_exhausted'}
+        }
+    ]
+
+
+def test_save_query_bundle_roundtrip(tmp_path):
+    """Test that one bundle write lands in all three tables."""
+    store = QueryMetadataStore(db_path=str(tmp_path / "metadata.db"))
+    chunks = _make_chunks()
+
+    store.save_query_bundle(
+        query_id='q1',
+        query_text='What is the capital of France?',
+        chunks=chunks,
+        response_id='r1',
+        answer_text='Paris.',
+        usage={'prompt_tokens': 30, 'completion_tokens': 10, 'total_tokens': 40},
+        chunks_included_count=1,
+        budget=1000,
+        model='mistral-small',
+        temperature=0.7,
+        budget_used=50.0,
+        optimization_result={'selected_chunks': [chunks[0]]}
+    )
+
+    query = store.get_query('q1')
+    assert query is not None
+    assert query['query_text'] == 'What is the capital of France?'
+    assert query['budget'] == 1000
+
+    saved_chunks = store.get_query_chunks('q1')
+    assert len(saved_chunks) == 2
+    # Ordered by similarity score descending
+    assert saved_chunks[0]['chunk_id'] == 'c1'
+    assert bool(saved_chunks[0]['included'])
+    assert not bool(saved_chunks[1]['included'])
+
+    response = store.get_response('q1')
+    assert response is not None
+    assert response['total_tokens'] == 40
+    assert response['chunks_included_count'] == 1
+
+    history = store.get_query_history(limit=10)
+    assert history[0]['id'] == 'q1'
+    assert history[0]['answer_text'] == 'Paris.'
+
+    store.close()
+
+
+def test_save_query_bundle_rolls_back_on_failure(tmp_path):
+    """Test that a failed bundle leaves no partial rows behind."""
+    store = QueryMetadataStore(db_path=str(tmp_path / "metadata.db"))
+    bad_chunks = _make_chunks()
+    # Lists cannot be bound as SQLite parameters, so the chunk insert
+    # fails after the query row was written inside the transaction
+    bad_chunks[1]['similarity_score'] = [0.5]
+
+    with pytest.raises(Exception):
+        store.save_query_bundle(
+            query_id='q-bad',
+            query_text='Doomed query',
+            chunks=bad_chunks,
+            response_id='r-bad',
+            answer_text='Never stored',
+            usage={'total_tokens': 1},
+            chunks_included_count=0
+        )
+
+    assert store.get_query('q-bad') is None
+    assert store.get_query_chunks('q-bad') == []
+    assert store.get_response('q-bad') is None
+
+    store.close()
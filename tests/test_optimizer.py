@@ -55,3 +55,103 @@ def test_optimize_empty_chunks():
     result = optimize_context([], budget=1000)
     assert len(result['selected_chunks']) == 0
     assert result['total_tokens'] == 0
+
+
+def test_optimize_context_mmr_deprioritizes_duplicates():
+    """Test MMR selection picks diverse chunks before near-duplicates."""
+    from contextllm.utils.config import get_config
+
+    # Chunks 'a' and 'b' share an embedding direction; 'c' is orthogonal
+    chunks = [
+        {
+            'chunk_id': 'mmr-a',
+            'text': 'The capital of France is Paris.',
+            'similarity_score': 0.9,
+            'embedding': [1.0, 0.0],
+            'metadata': {}
+        },
+        {
+            'chunk_id': 'mmr-b',
+            'text': 'Paris is the capital city of France.',
+            'similarity_score': 0.89,
+            'embedding': [1.0, 0.0],
+            'metadata': {}
+        },
+        {
+            'chunk_id': 'mmr-c',
+            'text': 'Berlin is the capital of Germany.',
+            'similarity_score': 0.5,
+            'embedding': [0.0, 1.0],
+            'metadata': {}
+        }
+    ]
+
+    config = get_config()
+    config.set("optimization.redundancy_weight", 5.0)
+    try:
+        result = optimize_context(chunks, budget=1000)
+    finally:
+        config.set("optimization.redundancy_weight", 0.0)
+
+    assert result['selection_metadata']['algorithm'] == 'greedy_mmr'
+    selected_ids = [chunk['chunk_id'] for chunk in result['selected_chunks']]
+    # The orthogonal chunk is picked before the near-duplicate despite
+    # its lower relevance score
+    assert selected_ids[0] == 'mmr-a'
+    assert selected_ids[1] == 'mmr-c'
+
+
+def test_optimize_context_mmr_respects_budget():
+    """Test MMR selection stays within the available budget."""
+    from contextllm.optimization.token_estimator import clear_chunk_token_cache
+    from contextllm.utils.config import get_config
+
+    clear_chunk_token_cache()
+    chunks = [
+        {
+            'chunk_id': f'mmr-budget-{i}',
+            'text': f'word{i} ' * 400,
+            'similarity_score': 0.9 - i * 0.1,
+            'embedding': [float(i == 0), float(i == 1), float(i == 2)],
+            'metadata': {}
+        }
+        for i in range(3)
+    ]
+
+    config = get_config()
+    config.set("optimization.redundancy_weight", 1.0)
+    try:
+        result = optimize_context(chunks, budget=1000)
+    finally:
+        config.set("optimization.redundancy_weight", 0.0)
+
+    # Budget 1000 minus the reserve leaves room for at most two of these
+    # large chunks; everything else must land in excluded_chunks
+    available = result['selection_metadata']['available_budget']
+    assert result['total_tokens'] <= available
+    assert len(result['excluded_chunks']) >= 1
+    assert len(result['selected_chunks']) + len(result['excluded_chunks']) == len(chunks)
+
+
+def test_optimize_context_mmr_fallback_without_embeddings():
+    """Test MMR falls back to greedy when chunks lack embeddings."""
+    from contextllm.utils.config import get_config
+
+    chunks = [
+        {
+            'chunk_id': 'mmr-plain',
+            'text': 'Chunk without an embedding.',
+            'similarity_score': 0.7,
+            'metadata': {}
+        }
+    ]
+
+    config = get_config()
+    config.set("optimization.redundancy_weight", 1.0)
+    try:
+        result = optimize_context(chunks, budget=1000)
+    finally:
+        config.set("optimization.redundancy_weight", 0.0)
+
+    assert result['selection_metadata']['algorithm'] == 'greedy_value_per_token'
+    assert len(result['selected_chunks']) == 1